@@ -4,20 +4,50 @@ Polished UI + Map Preview + Theme Toggle + EPSG Search + Reports ZIP + Size Guar
 """
 
 from __future__ import annotations
-import io, zipfile, tempfile
+import io, os, time, shutil, zipfile, tempfile, hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple, List, Dict
 
 import streamlit as st
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-from shapely.geometry import Point
+import shapely
+from shapely.geometry import Point, box
 
-# Optional geometry repair (Shapely 2.x)
+# Shapely 2.x exposes vectorized ufuncs that loop over geometry arrays in C
+_SHAPELY2 = int(shapely.__version__.split(".")[0]) >= 2
+
+# Optional geometry repair (Shapely 2.x vectorized, or 1.8 per-geometry)
 try:
     from shapely import make_valid
 except Exception:
-    make_valid = None
+    try:
+        from shapely.validation import make_valid
+    except Exception:
+        make_valid = None
+_VECTORIZED_MAKE_VALID = _SHAPELY2 and make_valid is not None
+
+# CRS lookups / reprojection pipelines
+try:
+    from pyproj import CRS, Transformer
+except Exception:
+    CRS = None
+    Transformer = None
+
+# Optional fast vector I/O (GDAL via pyogrio; Arrow batches when pyarrow is installed)
+try:
+    import pyogrio
+except Exception:
+    pyogrio = None
+try:
+    import pyarrow
+    import pyarrow.csv as pa_csv
+except Exception:
+    pyarrow = None
+    pa_csv = None
 
 # Optional map preview deps
 try:
@@ -30,8 +60,9 @@ except Exception:
 # ===================== App Config & CSS =====================
 st.set_page_config(page_title="GIS Format Converter — 80/20", page_icon="🗺️", layout="wide")
 
-st.markdown(
-    """
+# Static styles. Streamlit drops elements a rerun doesn't re-emit, so this can't be
+# gated to the first run; instead base + theme CSS go out as one element.
+APP_CSS = """
     <style>
       .block-container {max-width: 1200px; padding-top: 2.5rem;   /* ⬅️ was 0.6rem, now more */ padding-bottom: 1.5rem;}
       .st-card {background: #111418; border: 1px solid #2a2f36; border-radius: 14px; padding: 1rem 1.1rem;}
@@ -42,7 +73,20 @@ st.markdown(
       .stTabs [data-baseweb="tab"] {font-weight:600}
       .section-line { height:1px; background:#2a2f36; margin: 12px 0 18px 0; border-radius:1px; }
     </style>
-    """,
+    """
+# Light theme overrides (subtle)
+LIGHT_THEME_CSS = """
+    <style>
+      body, .stApp { background: #fafafa; color:#111; }
+      .st-card { background:#fff; border-color:#e5e7eb; }
+      .chip { border-color:#e5e7eb; }
+    </style>
+    """
+_CSS_BY_THEME = {"dark": APP_CSS, "light": APP_CSS + LIGHT_THEME_CSS}
+
+# The toggle's state is already in session_state at the top of a rerun
+st.markdown(
+    _CSS_BY_THEME["light" if st.session_state.get("_light_toggle") else "dark"],
     unsafe_allow_html=True,
 )
 
@@ -53,17 +97,41 @@ VEC_INPUTS = {
     ".json": "GeoJSON",
     ".kml": "KML",
     ".gpkg": "GeoPackage",
+    ".fgb": "FlatGeobuf",
     ".gml": "GML (basic)",
     ".gpx": "GPX",
     ".dxf": "DXF (CAD basic)",
 }
+# Inputs read in bulk through pyogrio; KML/GPX/DXF stay on Fiona (GDAL Arrow support is incomplete there)
+PYOGRIO_INPUTS = {".zip", ".geojson", ".json", ".gpkg", ".fgb", ".gml"}
+# Read feature-by-feature even when pyarrow is present: GDAL's Arrow stream for
+# FlatGeobuf segfaults on NULL geometries (which our own .fgb output can contain)
+NO_ARROW_INPUTS = {".fgb"}
 TAB_INPUTS = {".csv": "CSV", ".xlsx": "Excel"}
 ALL_INPUTS = {**VEC_INPUTS, **TAB_INPUTS}
+# Newline-delimited GeoJSON is written in slices of this many rows to bound peak memory
+GEOJSON_CHUNK_ROWS = 500_000
+# Map preview: cap on rendered features; simplify tolerance as a fraction of the layer extent
+PREVIEW_MAX_FEATURES = 2000
+PREVIEW_SIMPLIFY_FRACTION = 1 / 2000
+# Large layers are previewed through a viewport inset this fraction from each edge of the layer bbox
+PREVIEW_VIEWPORT_INSET = 0.05
+# Outputs that are already dense/compressed; DEFLATE on them burns CPU for ~no size gain
+ZIP_STORED_SUFFIXES = (".gpkg", ".kmz", ".zip")
+# Layers made only of these types skip make_valid/simplify (always valid, nothing to thin)
+POINT_TYPES = {"Point", "MultiPoint"}
+EPSG_ALIASES = {
+    "wgs84": "4326", "wgs 84": "4326",
+    "web mercator": "3857", "pseudo mercator": "3857", "mercator": "3857",
+    "utm 43n": "32643", "utm 44n": "32644",
+}
 OUTPUTS = {
     "geojson": "GeoJSON (.geojson)",
+    "geojsonseq": "GeoJSON Seq / NDJSON (.geojsonl)",
     "shapefile": "ESRI Shapefile (.zip)",
     "kml": "KML (.kml)",
     "gpkg": "GeoPackage (.gpkg)",
+    "flatgeobuf": "FlatGeobuf (.fgb)",
     "gpx": "GPX (.gpx)",
 }
 
@@ -101,7 +169,7 @@ with st.container():
         """
         This **GIS Format Converter — 80/20 Universal** helps you:
 
-        - Convert between **Shapefile, GeoJSON, KML, GPKG, GPX**  
+        - Convert between **Shapefile, GeoJSON, KML, GPKG, FlatGeobuf, GPX**  
         - Turn **CSV/Excel tables → Points** (lat/lon)  
         - Reproject to any **EPSG code** (default WGS84:4326)  
         - Repair/simplify geometries for web maps  
@@ -115,20 +183,6 @@ with st.container():
 
 
 
-# Apply light theme CSS (subtle)
-if st.session_state["_theme"] == "light":
-    st.markdown(
-        """
-        <style>
-          body, .stApp { background: #fafafa; color:#111; }
-          .st-card { background:#fff; border-color:#e5e7eb; }
-          .chip { border-color:#e5e7eb; }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
-
-
 # ===================== Sidebar =====================
 st.sidebar.header("⚙️ Options")
 
@@ -136,26 +190,21 @@ st.sidebar.header("⚙️ Options")
 with st.sidebar.expander("CRS", expanded=True):
     target_epsg = st.text_input("Target EPSG", value="4326", help="4326=WGS84 lat/lon, 3857=Web Mercator")
 
+    @st.cache_data(show_spinner=False)
     def find_epsg_guess(q: str) -> str | None:
-        try:
-            from pyproj import CRS
-        except Exception:
+        # Cached across reruns: CRS parsing and to_epsg() both hit proj.db
+        if CRS is None:
             return None
         q = (q or "").strip()
         if not q:
             return None
+        if q.lower() in EPSG_ALIASES:
+            return EPSG_ALIASES[q.lower()]
         if q.isdigit():
             try:
                 CRS.from_epsg(int(q)); return q
             except Exception:
                 pass
-        aliases = {
-            "wgs84": "4326", "wgs 84": "4326",
-            "web mercator": "3857", "pseudo mercator": "3857", "mercator": "3857",
-            "utm 43n": "32643", "utm 44n": "32644",
-        }
-        if q.lower() in aliases:
-            return aliases[q.lower()]
         try:
             crs = CRS.from_user_input(q)
             epsg = crs.to_epsg()
@@ -175,7 +224,6 @@ with st.sidebar.expander("CRS", expanded=True):
 # Geometry quality group
 with st.sidebar.expander("Geometry quality"):
     do_make_valid = st.checkbox("Fix invalid (make_valid)", value=True)
-    use_buffer_fix = st.checkbox("Fallback buffer(0)")
     do_simplify = st.checkbox("Simplify geometry")
     simplify_tol = st.number_input("Tolerance", min_value=0.0, value=0.0, step=0.5, help="Units = layer CRS") if do_simplify else 0.0
 
@@ -192,9 +240,11 @@ with st.sidebar.expander("PostGIS (beta)"):
     pg_geom = st.text_input("Geometry column", value="geom")
     colA, colB = st.columns(2)
 
+    @st.cache_resource(show_spinner=False)
     def _get_engine(url: str):
+        # One pooled engine per URL, reused across reruns and button presses
         from sqlalchemy import create_engine
-        return create_engine(url, pool_pre_ping=True)
+        return create_engine(url, pool_pre_ping=True, pool_size=1, max_overflow=2)
 
     def _read_postgis_table(url: str, table: str, geom_col: str = "geom") -> gpd.GeoDataFrame:
         eng = _get_engine(url)
@@ -245,71 +295,213 @@ def _save_upload_to(temp_dir: Path, file) -> Path:
     return out_path
 
 
-def _unzip_if_shapefile(p: Path, work: Path) -> Optional[Path]:
-    if p.suffix.lower() != ".zip":
-        return None
+def _zip_info(name: str) -> zipfile.ZipInfo:
+    """ZipInfo for one archive entry, stored as-is when the payload won't compress."""
+    info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+    info.external_attr = 0o600 << 16
+    info.compress_type = zipfile.ZIP_STORED if name.lower().endswith(ZIP_STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+    return info
+
+
+def _shp_vsi_path(p: Path) -> str:
+    """GDAL path to the first .shp inside a zip, read in place without extracting."""
     with zipfile.ZipFile(p, 'r') as zf:
-        zf.extractall(work)
-    return work
+        shp_name = next(
+            (n for n in zf.namelist() if n.lower().endswith(".shp") and not n.startswith("__MACOSX/")),
+            None,
+        )
+    if shp_name is None:
+        raise ValueError("No .shp found inside the uploaded .zip")
+    return f"/vsizip/{p.as_posix()}/{shp_name}"
 
 
 def _read_vector_any(path: Path) -> gpd.GeoDataFrame:
-    if path.suffix.lower() == ".zip":
-        shp_dir = _unzip_if_shapefile(path, path.parent / "unzipped")
-        if not shp_dir:
-            raise ValueError("Failed to unpack shapefile .zip")
-        shp_files = list(shp_dir.rglob("*.shp"))
-        if not shp_files:
-            raise ValueError("No .shp found inside the uploaded .zip")
-        return gpd.read_file(str(shp_files[0]))
-    return gpd.read_file(str(path))
+    ext = path.suffix.lower()
+    src = _shp_vsi_path(path) if ext == ".zip" else str(path)
+    if pyogrio is not None and ext in PYOGRIO_INPUTS:
+        return pyogrio.read_dataframe(src, use_arrow=pyarrow is not None and ext not in NO_ARROW_INPUTS)
+    return gpd.read_file(src)
+
+
+def _c_engine_headers(columns) -> List[str]:
+    """Name columns the way pandas' C engine does: blank → 'Unnamed: i', repeats → 'name.1', …
+
+    Arrow keeps blank/duplicate headers verbatim; normalizing keeps output field
+    names independent of which CSV parser ran.
+    """
+    blank = [i for i, c in enumerate(columns) if str(c) == ""]
+    header = [str(c) if i not in blank else f"Unnamed: {i}" for i, c in enumerate(columns)]
+    names = list(header)
+    counts: Dict[str, int] = {}
+    # Given names claim their spelling before generated 'Unnamed: i' ones, as in the C parser
+    for i in [i for i in range(len(header)) if i not in blank] + blank:
+        col = old_col = header[i]
+        n = counts.get(col, 0)
+        while n > 0:
+            counts[old_col] = n + 1
+            col = f"{old_col}.{n}"
+            # Skip suffixes that already exist as real headers
+            n = n + 1 if col in header else counts.get(col, 0)
+        counts[col] = n + 1
+        names[i] = col
+    return names
+
+
+def _read_csv_fast(path: Path) -> pd.DataFrame:
+    """Parse with pandas' multithreaded pyarrow engine when available, else the default C engine."""
+    try:
+        df = pd.read_csv(path, engine="pyarrow")
+    except (ImportError, ValueError):
+        return pd.read_csv(path)
+    df.columns = _c_engine_headers(df.columns)
+    return df
+
+
+def _preview_csv(path: Path, nrows: int = 200) -> pd.DataFrame:
+    """Read only the leading blocks of a CSV, not the whole file."""
+    if pa_csv is None:
+        return pd.read_csv(path, nrows=nrows)
+    try:
+        reader = pa_csv.open_csv(str(path), read_options=pa_csv.ReadOptions(block_size=1 << 20))
+        batches, n = [], 0
+        for batch in reader:
+            batches.append(batch)
+            n += batch.num_rows
+            if n >= nrows:
+                break
+        df = pyarrow.Table.from_batches(batches, schema=reader.schema).slice(0, nrows).to_pandas()
+    except ValueError:  # ArrowInvalid, e.g. ragged rows the C engine tolerates
+        return pd.read_csv(path, nrows=nrows)
+    df.columns = _c_engine_headers(df.columns)
+    return df
+
+
+def _read_excel(path: Path, **kwargs) -> pd.DataFrame:
+    """Prefer the Rust-based calamine reader (pandas >= 2.2); fall back to openpyxl."""
+    try:
+        return pd.read_excel(path, engine="calamine", **kwargs)
+    except (ImportError, ValueError):
+        return pd.read_excel(path, **kwargs)  # needs openpyxl
 
 
 def _read_csv_points(path: Path, lat_col: str, lon_col: str, src_epsg: str) -> gpd.GeoDataFrame:
     if path.suffix.lower() == ".csv":
-        df = pd.read_csv(path)
+        df = _read_csv_fast(path)
     else:
         try:
-            df = pd.read_excel(path)  # needs openpyxl
+            df = _read_excel(path)
         except ImportError:
-            raise RuntimeError("Reading .xlsx needs 'openpyxl'. Install it or export CSV.")
+            raise RuntimeError("Reading .xlsx needs 'python-calamine' or 'openpyxl'. Install one or export CSV.")
     if lat_col not in df.columns or lon_col not in df.columns:
         raise ValueError("Selected Lat/Lon columns not found.")
     df = df.dropna(subset=[lat_col, lon_col]).copy()
-    df[lat_col] = pd.to_numeric(df[lat_col], errors="coerce")
-    df[lon_col] = pd.to_numeric(df[lon_col], errors="coerce")
+    coord_cols = list(dict.fromkeys([lat_col, lon_col]))  # the wizard may pick one column for both
+    df[coord_cols] = df[coord_cols].apply(pd.to_numeric, errors="coerce")
     df = df.dropna(subset=[lat_col, lon_col])
+    if _SHAPELY2:
+        geom = shapely.points(df[lon_col].to_numpy(), df[lat_col].to_numpy())
+    else:
+        geom = [Point(xy) for xy in zip(df[lon_col], df[lat_col])]
     g = gpd.GeoDataFrame(
         df,
-        geometry=[Point(xy) for xy in zip(df[lon_col], df[lat_col])],
+        geometry=gpd.GeoSeries(geom, index=df.index),
         crs=f"EPSG:{src_epsg}"
     )
     return g
 
 
-def _apply_repairs_and_ops(gdf: gpd.GeoDataFrame) -> Tuple[gpd.GeoDataFrame, List[str]]:
+def _upload_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# Parsed layers are memoized on the upload's content hash, so reruns that only
+# change sidebar options skip the GDAL parse. `_data` is excluded from hashing.
+@st.cache_data(max_entries=4, show_spinner=False)
+def _read_vector_cached(digest: str, name: str, _data: bytes) -> gpd.GeoDataFrame:
+    path = Path(tempfile.mkdtemp(prefix="gisconv_read_")) / name
+    path.write_bytes(_data)
+    return _read_vector_any(path)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _read_csv_points_cached(digest: str, name: str, lat_col: str, lon_col: str, src_epsg: str,
+                            _data: bytes) -> gpd.GeoDataFrame:
+    path = Path(tempfile.mkdtemp(prefix="gisconv_read_")) / name
+    path.write_bytes(_data)
+    return _read_csv_points(path, lat_col, lon_col, src_epsg)
+
+
+def _set_geoms(gdf: gpd.GeoDataFrame, geoms) -> gpd.GeoDataFrame:
+    """Replace the active geometry column with an array of geometries (same order)."""
+    gdf[gdf.geometry.name] = gpd.GeoSeries(geoms, index=gdf.index, crs=gdf.crs)
+    return gdf
+
+
+def _apply_repairs_and_ops(gdf: gpd.GeoDataFrame, opts: Dict) -> Tuple[gpd.GeoDataFrame, List[str]]:
     notes: List[str] = []
-    if do_make_valid and make_valid is not None:
+    simplify_tol = opts["simplify_tol"]
+    geom_types = set(gdf.geom_type.dropna().unique())
+    if not geom_types:
+        # Empty layer or only NULL geometries: nothing to repair or simplify
+        return gdf, notes
+    # Points can't be invalid and have nothing to simplify (e.g. the whole CSV→Points path)
+    if not (geom_types - POINT_TYPES):
+        if opts["make_valid"] or simplify_tol > 0:
+            notes.append("Point layer: skipped make_valid/simplify.")
+        return gdf, notes
+    if opts["make_valid"]:
         try:
-            gdf["geometry"] = gdf.geometry.apply(make_valid)
-            notes.append("Applied make_valid.")
+            if _VECTORIZED_MAKE_VALID:
+                gdf = _set_geoms(gdf, make_valid(gdf.geometry.to_numpy()))
+                notes.append("Applied make_valid.")
+            elif make_valid is not None:
+                gdf["geometry"] = gdf.geometry.apply(make_valid)
+                notes.append("Applied make_valid.")
+            else:
+                # Shapely < 1.8 has no make_valid; buffer(0) is the legacy stand-in
+                gdf["geometry"] = gdf.buffer(0)
+                notes.append("Applied buffer(0) fix (make_valid unavailable).")
         except Exception as e:
             notes.append(f"make_valid failed: {e}")
-    if use_buffer_fix:
+    if simplify_tol > 0:
         try:
-            gdf["geometry"] = gdf.buffer(0)
-            notes.append("Applied buffer(0) fix.")
-        except Exception as e:
-            notes.append(f"buffer(0) failed: {e}")
-    if do_simplify and simplify_tol > 0:
-        try:
-            gdf["geometry"] = gdf.geometry.simplify(simplify_tol, preserve_topology=True)
+            if _SHAPELY2:
+                gdf = _set_geoms(gdf, shapely.simplify(gdf.geometry.to_numpy(), simplify_tol, preserve_topology=True))
+            else:
+                gdf["geometry"] = gdf.geometry.simplify(simplify_tol, preserve_topology=True)
             notes.append(f"Simplified (tol={simplify_tol}).")
         except Exception as e:
             notes.append(f"Simplify failed: {e}")
     return gdf, notes
 
 
+@lru_cache(maxsize=256)
+def _crs_from_epsg(code: int):
+    return CRS.from_epsg(code)
+
+
+@lru_cache(maxsize=256)
+def _transformer(src_crs, tgt_crs):
+    """Build each PROJ pipeline once per run.
+
+    Keyed on the CRS objects themselves, so batch files whose .prj has no EPSG
+    code still share a pipeline when their source CRS matches.
+    """
+    return Transformer.from_crs(src_crs, tgt_crs, always_xy=True)
+
+
+def _transform_geoms(geoms, transformer):
+    """Push every vertex through `transformer` as flat coordinate arrays, or None if Z is mixed."""
+    has_z = shapely.has_z(geoms)
+    include_z = bool(has_z.all()) if len(has_z) else False
+    if has_z.any() and not include_z:
+        return None
+    coords = shapely.get_coordinates(geoms, include_z=include_z)
+    new_coords = np.column_stack(transformer.transform(*coords.T))
+    # set_coordinates writes into the array it is given; never the caller's
+    return shapely.set_coordinates(geoms.copy(), new_coords)
+
+
 def _reproject(gdf: gpd.GeoDataFrame, epsg: str) -> Tuple[gpd.GeoDataFrame, Optional[str]]:
     try:
         tgt = int(epsg)
@@ -318,38 +510,82 @@ def _reproject(gdf: gpd.GeoDataFrame, epsg: str) -> Tuple[gpd.GeoDataFrame, Opti
     try:
         if gdf.crs is None:
             return gdf, "Source CRS unknown; cannot reproject."
-        if gdf.crs.to_epsg() == tgt:
+        if not (_SHAPELY2 and Transformer is not None):
+            if gdf.crs.to_epsg() == tgt:
+                return gdf, None
+            return gdf.to_crs(tgt), f"Reprojected to EPSG:{tgt}."
+        tgt_crs = _crs_from_epsg(tgt)
+        # Equivalence check instead of to_epsg(), which searches proj.db on every call
+        if gdf.crs.equals(tgt_crs, ignore_axis_order=True):
             return gdf, None
-        gdf = gdf.to_crs(tgt)
+        geoms = _transform_geoms(gdf.geometry.to_numpy(), _transformer(gdf.crs, tgt_crs))
+        if geoms is None:
+            gdf = gdf.to_crs(tgt_crs)
+        else:
+            gdf = gdf.copy()
+            gdf[gdf.geometry.name] = gpd.GeoSeries(geoms, index=gdf.index, crs=tgt_crs)
         return gdf, f"Reprojected to EPSG:{tgt}."
     except Exception as e:
         return gdf, f"Reprojection failed: {e}"
 
 
 def _truncate_fields_for_shp(columns: List[str]) -> Tuple[Dict[str, str], List[str]]:
-    mapping: Dict[str, str] = {}
-    warnings: List[str] = []
-    for c in columns:
-        if len(c) > 10:
-            newc = c[:10]
-            mapping[c] = newc
-            warnings.append(f"Field '{c}' → '{newc}' (Shapefile 10-char limit)")
+    bad = [c for c in columns if len(c) > 10]
+    if not bad:
+        return {}, []
+    mapping: Dict[str, str] = {c: c[:10] for c in bad}
+    warnings = [f"Field '{c}' → '{newc}' (Shapefile 10-char limit)" for c, newc in mapping.items()]
     return mapping, warnings
 
 
-def _gdf_to_bytes(gdf: gpd.GeoDataFrame, out_fmt: str, base: str) -> Tuple[bytes, str, List[str]]:
+def _write_geojson(gdf: gpd.GeoDataFrame, path: Path, driver: str) -> None:
+    """Let GDAL stream features straight to disk instead of building one JSON string in Python."""
+    if pyogrio is None:
+        gdf.to_file(path, driver=driver)
+        return
+    if driver == "GeoJSONSeq" and len(gdf) > GEOJSON_CHUNK_ROWS:
+        for start in range(0, len(gdf), GEOJSON_CHUNK_ROWS):
+            chunk = gdf.iloc[start:start + GEOJSON_CHUNK_ROWS]
+            pyogrio.write_dataframe(chunk, path, driver=driver, append=start > 0)
+        return
+    pyogrio.write_dataframe(gdf, path, driver=driver)
+
+
+def _gdf_to_file(gdf: gpd.GeoDataFrame, out_fmt: str, base: str,
+                 rename_fields: bool = True) -> Tuple[Path, str, List[str]]:
+    """Write the layer under a fresh temp dir; returns (path on disk, download name, messages)."""
     out_fmt = out_fmt.lower()
     msgs: List[str] = []
+    out_dir = Path(tempfile.mkdtemp(prefix="gisconv_out_"))
 
     if out_fmt == "geojson":
-        return gdf.to_json().encode("utf-8"), f"{base}.geojson", msgs
+        path = out_dir / f"{base}.geojson"
+        if pyogrio is None:
+            path.write_text(gdf.to_json(), encoding="utf-8")
+        else:
+            _write_geojson(gdf, path, "GeoJSON")
+        return path, path.name, msgs
 
-    out_dir = Path(tempfile.mkdtemp(prefix="gisconv_out_"))
+    if out_fmt == "geojsonseq":
+        path = out_dir / f"{base}.geojsonl"
+        _write_geojson(gdf, path, "GeoJSONSeq")
+        return path, path.name, msgs
 
     if out_fmt == "gpkg":
         path = out_dir / f"{base}.gpkg"
         gdf.to_file(path, driver="GPKG")
-        return path.read_bytes(), path.name, msgs
+        return path, path.name, msgs
+
+    if out_fmt == "flatgeobuf":
+        # Single binary file with a packed R-tree; fastest format to re-read downstream
+        path = out_dir / f"{base}.fgb"
+        if gdf.geometry.isna().any():
+            # GDAL's FlatGeobuf index rejects NULL geometries; keep the rows, skip the index
+            gdf.to_file(path, driver="FlatGeobuf", SPATIAL_INDEX="NO")
+            msgs.append("FlatGeobuf written without spatial index (layer has NULL geometries).")
+        else:
+            gdf.to_file(path, driver="FlatGeobuf")
+        return path, path.name, msgs
 
     if out_fmt == "kml":
         path = out_dir / f"{base}.kml"
@@ -363,7 +599,7 @@ def _gdf_to_bytes(gdf: gpd.GeoDataFrame, out_fmt: str, base: str) -> Tuple[bytes
         except Exception as e:
             msgs.append(f"KML write failed ({e}); use GeoJSON/GPKG instead.")
             raise
-        return path.read_bytes(), path.name, msgs
+        return path, path.name, msgs
 
     if out_fmt == "gpx":
         path = out_dir / f"{base}.gpx"
@@ -372,25 +608,109 @@ def _gdf_to_bytes(gdf: gpd.GeoDataFrame, out_fmt: str, base: str) -> Tuple[bytes
         except Exception as e:
             msgs.append(f"GPX write failed ({e}); use GeoJSON/GPKG instead.")
             raise
-        return path.read_bytes(), path.name, msgs
+        return path, path.name, msgs
 
     if out_fmt == "shapefile":
         mapping, warns = _truncate_fields_for_shp(list(gdf.columns))
-        if auto_rename_fields and mapping:
+        if rename_fields and mapping:
             gdf = gdf.rename(columns=mapping)
             msgs.extend(warns)
+        # GDAL >= 3.1 writes a zipped shapefile directly; older builds go through a folder
+        zip_path = out_dir / f"{base}.shp.zip"
+        try:
+            gdf.to_file(zip_path, driver="ESRI Shapefile")
+            return zip_path, f"{base}.zip", msgs
+        except Exception:
+            pass
         shp_folder = out_dir / f"{base}_shp"
         _safe_mkdir(shp_folder)
         shp_path = shp_folder / f"{base}.shp"
         gdf.to_file(shp_path, driver="ESRI Shapefile")
-        zip_bytes = io.BytesIO()
-        with zipfile.ZipFile(zip_bytes, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zip_path = out_dir / f"{base}.zip"
+        with zipfile.ZipFile(zip_path, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
             for p in shp_folder.iterdir():
                 zf.write(p, arcname=p.name)
-        return zip_bytes.getvalue(), f"{base}.zip", msgs
+        return zip_path, zip_path.name, msgs
 
     raise ValueError(f"Unsupported output format: {out_fmt}")
 
+
+def _gdf_to_bytes(gdf: gpd.GeoDataFrame, out_fmt: str, base: str,
+                  rename_fields: bool = True) -> Tuple[bytes, str, List[str]]:
+    path, out_name, msgs = _gdf_to_file(gdf, out_fmt, base, rename_fields)
+    try:
+        return path.read_bytes(), out_name, msgs
+    finally:
+        shutil.rmtree(path.parent, ignore_errors=True)
+
+
+def _convert_one(data: bytes, name: str, opts: Dict) -> Tuple[Optional[str], Optional[Path], List[str]]:
+    """Read → repair → reproject → write one upload to a temp file.
+
+    Uses only its arguments (no Streamlit widgets/state), so batch files can be
+    converted concurrently in worker threads. The caller owns the output's
+    parent temp dir.
+    """
+    report_lines: List[str] = []
+    if Path(name).suffix.lower() in TAB_INPUTS:
+        report_lines.append("Skipped: CSV/XLSX needs column mapping in single-file wizard mode.")
+        return None, None, report_lines
+    src_path = Path(tempfile.mkdtemp(prefix="gisconv_batch_")) / name
+    try:
+        src_path.write_bytes(data)
+        gdf = _read_vector_any(src_path)
+        report_lines.append(f"Loaded vector with {len(gdf)} features. CRS={gdf.crs}.")
+        gdf, notes = _apply_repairs_and_ops(gdf, opts)
+        report_lines.extend(notes)
+        gdf, reproj_note = _reproject(gdf, opts["target_epsg"])
+        if reproj_note:
+            report_lines.append(reproj_note)
+        out_path, out_name, msgs = _gdf_to_file(gdf, opts["out_fmt"], Path(name).stem, opts["rename_fields"])
+        report_lines.extend(msgs)
+        report_lines.append(f"Exported: {out_name}")
+        return out_name, out_path, report_lines
+    except Exception as e:
+        report_lines.append(f"Read/Process failed: {e}")
+        return None, None, report_lines
+    finally:
+        shutil.rmtree(src_path.parent, ignore_errors=True)
+
+
+def _dominant_geom_type(gdf: gpd.GeoDataFrame) -> Optional[str]:
+    """Most common geometry type, sampled from the head; this is an informational chip."""
+    # Slice before geom_type so only the sampled rows are inspected
+    types = gdf.geometry.head(1024).geom_type.dropna()
+    if types.empty:
+        # Leading rows are all null geometries; sample the first non-null ones instead
+        geoms = gdf.geometry
+        types = geoms[geoms.notna()].head(1024).geom_type
+    return str(types.value_counts().idxmax()) if len(types) else None
+
+
+def _preview_subset(gdf: gpd.GeoDataFrame, bounds: List[float]) -> gpd.GeoDataFrame:
+    """Cut a large layer down to at most PREVIEW_MAX_FEATURES inside a central viewport.
+
+    The STR-tree query only touches candidates in the viewport, so nothing
+    outside it is ever copied, reprojected or serialized. `bounds` is the
+    layer's total_bounds, already computed for Layer info.
+    """
+    minx, miny, maxx, maxy = bounds
+    dx = (maxx - minx) * PREVIEW_VIEWPORT_INSET
+    dy = (maxy - miny) * PREVIEW_VIEWPORT_INSET
+    viewport = box(minx + dx, miny + dy, maxx - dx, maxy - dy)
+    idx = gdf.sindex.intersection(viewport.bounds)
+    if len(idx) > PREVIEW_MAX_FEATURES:
+        # Uniform, seeded pick so the map stays stable across reruns
+        idx = np.sort(np.random.default_rng(0).choice(idx, PREVIEW_MAX_FEATURES, replace=False))
+    return gdf.iloc[idx].copy().clip(viewport)
+
+
+# Building the STR-tree costs far more than the query; the read cache hands back a
+# fresh frame (and so a fresh, unbuilt sindex) on every rerun, so memoize per upload.
+@st.cache_data(max_entries=4, show_spinner=False)
+def _preview_subset_cached(layer_key: tuple, _gdf: gpd.GeoDataFrame, _bounds: List[float]) -> gpd.GeoDataFrame:
+    return _preview_subset(_gdf, _bounds)
+
 # ===================== Tabs =====================
 convert_tab, reports_tab, help_tab = st.tabs(["🔄 Convert", "📑 Reports", "❓ Help"])
 
@@ -398,7 +718,7 @@ convert_tab, reports_tab, help_tab = st.tabs(["🔄 Convert", "📑 Reports", "
 with convert_tab:
     st.markdown("### Upload files")
     uploaded_files = st.file_uploader(
-        "Upload GIS files (.zip Shapefile, .geojson/.json, .kml, .gpkg, .gpx, .gml, .dxf, .csv, .xlsx)",
+        "Upload GIS files (.zip Shapefile, .geojson/.json, .kml, .gpkg, .fgb, .gpx, .gml, .dxf, .csv, .xlsx)",
         type=[ext.strip('.') for ext in ALL_INPUTS.keys()],
         accept_multiple_files=True,
     )
@@ -422,9 +742,9 @@ with convert_tab:
             p = _save_upload_to(tmp_dir, uploaded_files[0])
             try:
                 if p.suffix.lower() == ".csv":
-                    df_preview = pd.read_csv(p, nrows=200)
+                    df_preview = _preview_csv(p, nrows=200)
                 else:
-                    df_preview = pd.read_excel(p, nrows=200)
+                    df_preview = _read_excel(p, nrows=200)
             except Exception as e:
                 st.error(f"Could not read file: {e}")
                 df_preview = pd.DataFrame()
@@ -443,6 +763,15 @@ with convert_tab:
     out_fmt = st.selectbox("Output format", options=list(OUTPUTS.keys()), format_func=lambda k: OUTPUTS[k])
     do_batch = st.button("🔄 Convert (all uploaded files)", type="primary", use_container_width=True)
 
+    # Plain-dict snapshot of the sidebar settings, safe to hand to worker threads
+    conv_opts = {
+        "make_valid": do_make_valid,
+        "simplify_tol": simplify_tol,
+        "target_epsg": target_epsg,
+        "out_fmt": out_fmt,
+        "rename_fields": auto_rename_fields,
+    }
+
     if "_last_reports" not in st.session_state:
         st.session_state["_last_reports"] = []
 
@@ -450,73 +779,65 @@ with convert_tab:
         if not uploaded_files:
             st.warning("Please upload at least one file.")
         else:
-            overall_zip = io.BytesIO()
+            # The results ZIP is streamed to disk so peak memory stays flat however large the batch
+            zip_path = Path(tempfile.mkdtemp(prefix="gisconv_zip_")) / "converted_outputs.zip"
             reports: List[Tuple[str, str]] = []
+            jobs = [(uf.getvalue(), uf.name) for uf in uploaded_files]
             with st.spinner("Converting… this may take a moment for large files"):
-                with zipfile.ZipFile(overall_zip, mode="w", compression=zipfile.ZIP_DEFLATED) as z:
-                    for uf in uploaded_files:
-                        temp_dir = Path(tempfile.mkdtemp(prefix="gisconv_batch_"))
-                        src_path = _save_upload_to(temp_dir, uf)
-                        name_stem = Path(uf.name).stem
-                        report_lines: List[str] = []
-                        try:
-                            ext = src_path.suffix.lower()
-                            if ext in TAB_INPUTS:
-                                report_lines.append("Skipped: CSV/XLSX needs column mapping in single-file wizard mode.")
-                                rep_text = ("\n".join(report_lines) or "No details.").encode("utf-8")
-                                rep_name = f"{name_stem}_report.txt"
-                                z.writestr(rep_name, rep_text)
-                                reports.append((rep_name, rep_text.decode("utf-8", errors="ignore")))
-                                continue
-                            gdf = _read_vector_any(src_path)
-                            report_lines.append(f"Loaded vector with {len(gdf)} features. CRS={gdf.crs}.")
-                            gdf, notes = _apply_repairs_and_ops(gdf)
-                            report_lines.extend(notes)
-                            gdf, reproj_note = _reproject(gdf, target_epsg)
-                            if reproj_note:
-                                report_lines.append(reproj_note)
-                            out_bytes, out_name, msgs = _gdf_to_bytes(gdf, out_fmt, name_stem)
-                            report_lines.extend(msgs)
-                            z.writestr(out_name, out_bytes)
-                            report_lines.append(f"Exported: {out_name}")
-                        except Exception as e:
-                            report_lines.append(f"Read/Process failed: {e}")
+                # GDAL and GEOS release the GIL, so threads overlap the heavy per-file work
+                with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as ex, \
+                        zipfile.ZipFile(zip_path, mode="w", compression=zipfile.ZIP_DEFLATED) as z:
+                    results = ex.map(lambda job: _convert_one(job[0], job[1], conv_opts), jobs)
+                    for (_, name), (out_name, out_path, report_lines) in zip(jobs, results):
+                        if out_path is not None:
+                            large = out_path.stat().st_size >= zipfile.ZIP64_LIMIT
+                            with open(out_path, "rb") as src, z.open(_zip_info(out_name), "w", force_zip64=large) as dst:
+                                shutil.copyfileobj(src, dst)
+                            shutil.rmtree(out_path.parent, ignore_errors=True)
                         # Write per-file report
                         rep_text = ("\n".join(report_lines) or "No details.").encode("utf-8")
-                        rep_name = f"{name_stem}_report.txt"
+                        rep_name = f"{Path(name).stem}_report.txt"
                         z.writestr(rep_name, rep_text)
                         reports.append((rep_name, rep_text.decode("utf-8", errors="ignore")))
             st.session_state["_last_reports"] = reports
             st.success("Batch conversion complete.")
-            st.download_button(
-                label=f"📦 Download results ZIP ({OUTPUTS[out_fmt]})",
-                data=overall_zip.getvalue(),
-                file_name="converted_outputs.zip",
-                mime="application/zip",
-                use_container_width=True,
-            )
+            with open(zip_path, "rb") as fh:
+                st.download_button(
+                    label=f"📦 Download results ZIP ({OUTPUTS[out_fmt]})",
+                    data=fh,
+                    file_name="converted_outputs.zip",
+                    mime="application/zip",
+                    use_container_width=True,
+                )
+            shutil.rmtree(zip_path.parent, ignore_errors=True)
 
     # Single-file preview & convert
     if uploaded_files and len(uploaded_files) == 1:
         uf = uploaded_files[0]
-        tdir = Path(tempfile.mkdtemp(prefix="gisconv_single_"))
-        p = _save_upload_to(tdir, uf)
+        data = uf.getvalue()
+        digest = _upload_digest(data)
         try:
-            if p.suffix.lower() in TAB_INPUTS:
+            if Path(uf.name).suffix.lower() in TAB_INPUTS:
                 if not (lat_col and lon_col):
                     st.info("Select Lat/Lon columns in the wizard above, then press Convert.")
                     gdf = None
                 else:
-                    gdf = _read_csv_points(p, lat_col, lon_col, src_epsg_for_csv or "4326")
+                    gdf = _read_csv_points_cached(digest, uf.name, lat_col, lon_col, src_epsg_for_csv or "4326", data)
                     st.success(f"CSV/XLSX ➜ points using lat={lat_col}, lon={lon_col}, srcEPSG={src_epsg_for_csv}.")
             else:
-                gdf = _read_vector_any(p)
+                gdf = _read_vector_cached(digest, uf.name, data)
         except Exception as e:
             st.error(f"Could not read file: {e}")
             gdf = None
 
         if gdf is not None:
             st.session_state["gdf_last_single"] = gdf
+            # The envelope is a full scan; keep it across reruns of the same upload/read settings
+            layer_key = (digest, lat_col, lon_col, src_epsg_for_csv)
+            cached_bbox = st.session_state.get("_layer_bbox")
+            if not cached_bbox or cached_bbox[0] != layer_key:
+                cached_bbox = (layer_key, gdf.total_bounds.tolist() if len(gdf) else None)
+                st.session_state["_layer_bbox"] = cached_bbox
             left, right = st.columns([2.2, 1])
             with left:
                 st.markdown("#### Preview")
@@ -525,7 +846,10 @@ with convert_tab:
                 # Map preview (if deps installed)
                 if folium is not None and st_folium is not None:
                     try:
-                        disp = gdf.copy()
+                        # Geometry only: attributes are never shown on the map but would be embedded in the page
+                        disp = gdf[[gdf.geometry.name]]
+                        if len(disp) > PREVIEW_MAX_FEATURES:
+                            disp = _preview_subset_cached(layer_key, disp, cached_bbox[1])
                         try:
                             if disp.crs is not None and disp.crs.to_epsg() != 4326:
                                 disp = disp.to_crs(4326)
@@ -534,11 +858,14 @@ with convert_tab:
                         if len(disp):
                             minx, miny, maxx, maxy = disp.total_bounds
                             center = [(miny + maxy) / 2.0, (minx + maxx) / 2.0]
+                            tol = max(maxx - minx, maxy - miny) * PREVIEW_SIMPLIFY_FRACTION
+                            if tol > 0:
+                                disp = disp.set_geometry(disp.geometry.simplify(tol, preserve_topology=False))
                         else:
                             center = [20.0, 0.0]
                         st.markdown("#### Map Preview")
                         m = folium.Map(location=center, zoom_start=3)
-                        folium.GeoJson(disp.to_json(), name="layer").add_to(m)
+                        folium.GeoJson(disp.__geo_interface__, name="layer").add_to(m)
                         st_folium(m, width=700, height=460)
                     except Exception as e:
                         st.info(f"Map preview not available: {e}")
@@ -547,24 +874,23 @@ with convert_tab:
 
             with right:
                 st.markdown("#### Layer info")
-                bbox = gdf.total_bounds if len(gdf) else None
                 st.json({
                     "features": int(len(gdf)),
-                    "geometry_type": str(gdf.geom_type.mode().iat[0]) if len(gdf) else None,
+                    "geometry_type": _dominant_geom_type(gdf),
                     "crs": str(gdf.crs) if gdf.crs else None,
-                    "bbox": bbox.tolist() if bbox is not None else None,
+                    "bbox": cached_bbox[1],
                 })
 
             st.markdown("---")
             if st.button("⬇️ Convert this file only", type="secondary", use_container_width=True):
                 with st.spinner("Converting…"):
-                    gdf2, notes = _apply_repairs_and_ops(gdf)
+                    gdf2, notes = _apply_repairs_and_ops(gdf, conv_opts)
                     gdf2, reproj_note = _reproject(gdf2, target_epsg)
                     if reproj_note:
                         notes.append(reproj_note)
                     base_default = Path(uf.name).stem
                     try:
-                        out_bytes, out_name, msgs = _gdf_to_bytes(gdf2, out_fmt, base_default)
+                        out_bytes, out_name, msgs = _gdf_to_bytes(gdf2, out_fmt, base_default, auto_rename_fields)
                         notes.extend(msgs)
                         st.download_button(
                             label=f"Download {OUTPUTS[out_fmt]}",
@@ -572,9 +898,11 @@ with convert_tab:
                             file_name=out_name,
                             mime=(
                                 "application/geo+json" if out_fmt == "geojson"
+                                else "application/geo+json-seq" if out_fmt == "geojsonseq"
                                 else "application/zip" if out_fmt == "shapefile"
                                 else "application/vnd.google-earth.kml+xml" if out_fmt == "kml"
                                 else "application/gpkg" if out_fmt == "gpkg"
+                                else "application/flatgeobuf" if out_fmt == "flatgeobuf"
                                 else "application/gpx+xml"
                             ),
                             use_container_width=True,
@@ -614,7 +942,7 @@ with help_tab:
     st.markdown(
         """
 **What this tool does**  
-- Convert between Shapefile/GeoJSON/KML/GPKG/GPX (+ CSV/XLSX → Points)  
+- Convert between Shapefile/GeoJSON/GeoJSONSeq/KML/GPKG/FlatGeobuf/GPX (+ CSV/XLSX → Points)  
 - Reproject to any EPSG (default 4326)  
 - Fix invalid geometries and simplify for web sharing  
 - Batch multiple files into one ZIP and emit per-file reports
@@ -622,7 +950,7 @@ with help_tab:
 **Tips**  
 - Shapefile limits: 10-char field names, 255 fields, ~2 GB → app can auto-rename.  
 - KML/GPX depend on GDAL build. If writing fails, choose GeoJSON/GPKG.  
-- For large layers, use GPKG or enable Simplify to keep files light.
+- For large layers, use GPKG or FlatGeobuf, or enable Simplify to keep files light.
 
 **Privacy**  
 Files are handled in temporary folders and not persisted.